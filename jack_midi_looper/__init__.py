@@ -20,71 +20,393 @@
 """
 A jack client which generates MIDI events by beat, not time, using "loops" imported from midi files.
 """
-import os, sqlite3, glob, re, io, logging
+import os, sqlite3, glob, io, zlib, logging
+from ast import literal_eval
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import nullcontext
+from itertools import repeat
+from copy import copy
+from hashlib import blake2b
 from threading import Event, Lock
-from math import ceil
-from random import choice
+from math import ceil, prod
 import numpy as np
-from appdirs import user_config_dir
-from mido import MidiFile
-from jack import Client, CallbackExit
+from appdirs import user_config_dir, user_cache_dir
+from mido import MidiFile, merge_tracks
+from jack import Client, CallbackExit, JackError
+# JACK-Client's cffi bindings, used to write whole blocks of MIDI events:
+from jack import _lib as _jack_lib, _ffi as _jack_ffi
 from log_soso import log_error
 from progress.bar import IncrementalBar
+try:
+	from numba import njit, types as numba_types
+except ImportError:
+	njit = None
 
 __version__ = "1.1.4"
 
-EVENT_STRUCT = np.dtype([ ('beat', float), ('msg', np.uint8, 3) ])
 DEFAULT_BEATS_PER_MEASURE = 4
 DEFAULT_BEATS_PER_MINUTE = 120
-DEFAULT_USECS_PER_BEAT = 500000
-USECS_PER_SECOND = 1000000
+TICKS_PER_BEAT = 960		# Resolution of event timing, all loops are converted to this
+NPY_MAGIC = b'\x93NUMPY'
+# Suggested value for "LoopsDB.parse_cache_dir":
+DEFAULT_PARSE_CACHE_DIR = os.path.join(user_cache_dir(), 'ZenSoSo', 'looper-midi')
+# Part of the key of cached parse results; increment when "read_midi_file"
+# returns something different for the same file:
+PARSE_CACHE_VERSION = 1
+
+
+class _GroupNameTable(dict):
+	"""
+	A str.translate table which maps underscores and every other character that
+	is not alphanumeric to a space, for making group names from paths.
+	Characters are looked up when first translated, and the result is kept.
+	"""
+
+	def __missing__(self, code_point):
+		char = chr(code_point)
+		self[code_point] = char if char.isalnum() else ' '
+		return self[code_point]
+
+GROUP_NAME_TABLE = _GroupNameTable()
+
+
+def _load_npy_bytes(buf, offset = 0):
+	"""
+	Returns a tuple (ndarray, end), reading the .npy stream which starts at
+	"offset" in "buf", a bytes object holding one or more streams written by
+	np.save. "end" is the offset of the byte following the stream.
+	The header is parsed here and the payload is viewed in place with
+	np.frombuffer, avoiding the chunked, copying read of np.load(io.BytesIO(buf)).
+	The returned array is read-only, as it shares memory with "buf".
+	"""
+	if buf[offset:offset + 6] != NPY_MAGIC:
+		raise ValueError('Not an npy buffer')
+	major_version = buf[offset + 6]
+	if major_version == 1:
+		header_len = int.from_bytes(buf[offset + 8:offset + 10], 'little')
+		header_start = offset + 10
+	else:
+		header_len = int.from_bytes(buf[offset + 8:offset + 12], 'little')
+		header_start = offset + 12
+	header_end = header_start + header_len
+	header = literal_eval(buf[header_start:header_end].decode('latin1'))
+	shape = header['shape']
+	dtype = np.dtype(header['descr'])
+	array = np.frombuffer(buf, dtype = dtype, count = prod(shape), offset = header_end)
+	end = header_end + array.nbytes
+	if header['fortran_order']:
+		return array.reshape(shape[::-1]).T, end
+	return array.reshape(shape), end
+
+
+def _dump_events(ticks, msgs):
+	"""
+	Returns a "midi_events" blob holding the given ticks and msgs arrays:
+	two consecutive .npy streams, ticks then msgs, compressed with zlib.
+	"""
+	evfile = io.BytesIO()
+	np.save(evfile, ticks)
+	np.save(evfile, msgs)
+	return zlib.compress(evfile.getvalue())
+
+
+def _load_events(buf):
+	"""
+	Returns a tuple (ticks, msgs) read from a "midi_events" blob.
+		ticks	: int32 array, the time of each event in TICKS_PER_BEAT ticks per beat
+		msgs	: uint8 array of shape (N, 3), the MIDI bytes of each event
+	Blobs are two consecutive .npy streams, ticks then msgs, compressed with zlib.
+	Blobs from databases imported by earlier versions are converted:
+		Uncompressed blobs are read as they are.
+		Float arrays of beats, in place of ticks, are converted to ticks.
+		Ticks stored as int64 are narrowed to int32.
+		A single structured array with fields "beat" and "msg" is split.
+	"""
+	if buf[:6] != NPY_MAGIC:
+		buf = zlib.decompress(buf)
+	array, end = _load_npy_bytes(buf)
+	if array.dtype.names:
+		array, msgs = array['beat'], np.ascontiguousarray(array['msg'])
+	else:
+		msgs, _ = _load_npy_bytes(buf, end)
+	if array.dtype.kind == 'f':
+		array = np.rint(array * TICKS_PER_BEAT)
+	return array.astype(np.int32, copy = False), msgs
+
+
+def _jit(func):
+	"""
+	Compiles "func" with numba, when numba is installed.
+	"""
+	return func if njit is None else njit(cache = True)(func)
+
+
+@_jit
+def _read_vlq(buf, pos):
+	"""
+	Returns a tuple (value, pos) - the variable length quantity starting at "pos"
+	in "buf", and the position of the byte following it.
+	"""
+	value = 0
+	while pos < len(buf):
+		byte = int(buf[pos])
+		pos += 1
+		value = (value << 7) | (byte & 0x7F)
+		if byte < 0x80:
+			break
+	return value, pos
+
+
+@_jit
+def _read_u32(buf, pos):
+	"""
+	Returns the big-endian 32-bit unsigned integer starting at "pos" in "buf".
+	"""
+	return (int(buf[pos]) << 24) | (int(buf[pos + 1]) << 16) | \
+		(int(buf[pos + 2]) << 8) | int(buf[pos + 3])
+
+
+@_jit
+def _parse_smf(buf):
+	"""
+	Parses a standard midi file held in "buf", a uint8 array.
+	Returns ticks_per_beat, numerator, denominator, ticks, msgs
+		ticks_per_beat	: (int) from the file header
+		numerator		: (int) of the last time signature; 0 if there is none
+		denominator		: (int) of the last time signature
+		ticks			: int64 nparray, the absolute tick of each note on event
+		msgs			: uint8 nparray of shape (N, 3), the bytes of each note on event
+	Events are returned track by track, each track in time order.
+	"""
+	size = len(buf)
+	if size < 14 or buf[0] != 0x4D or buf[1] != 0x54 or buf[2] != 0x68 or buf[3] != 0x64:
+		raise ValueError('Not a standard midi file')
+	division = (int(buf[12]) << 8) | int(buf[13])
+	if division & 0x8000:
+		raise ValueError('SMPTE time division is not supported')
+	# Every note on takes at least three bytes (delta time, note, velocity):
+	capacity = size // 3 + 1
+	ticks = np.empty(capacity, np.int64)
+	msgs = np.empty((capacity, 3), np.uint8)
+	count = 0
+	numerator = 0
+	denominator = 4
+	signature_tick = -1
+	pos = 8 + _read_u32(buf, 4)
+	while pos + 8 <= size:
+		is_track = buf[pos] == 0x4D and buf[pos + 1] == 0x54 \
+			and buf[pos + 2] == 0x72 and buf[pos + 3] == 0x6B
+		end = min(pos + 8 + _read_u32(buf, pos + 4), size)
+		pos += 8
+		if not is_track:
+			pos = end
+			continue
+		tick = 0
+		status = 0
+		while pos < end:
+			delta, pos = _read_vlq(buf, pos)
+			tick += delta
+			if pos >= end:
+				break
+			byte = int(buf[pos])
+			if byte == 0xFF:
+				# Meta event: type, length, data
+				if pos + 2 > end:
+					raise ValueError('Truncated meta event')
+				meta_type = int(buf[pos + 1])
+				length, pos = _read_vlq(buf, pos + 2)
+				if pos + length > end:
+					raise ValueError('Truncated meta event')
+				if meta_type == 0x58 and length >= 2 and tick >= signature_tick:
+					signature_tick = tick
+					numerator = int(buf[pos])
+					denominator = 1 << int(buf[pos + 1])
+				pos += length
+			elif byte == 0xF0 or byte == 0xF7:
+				# Sysex event: length, data
+				length, pos = _read_vlq(buf, pos + 1)
+				pos += length
+			elif byte > 0xF0:
+				# System common / realtime message
+				pos += 3 if byte == 0xF2 else 2 if byte == 0xF1 or byte == 0xF3 else 1
+			else:
+				if byte & 0x80:
+					status = byte
+					pos += 1
+				elif status == 0:
+					raise ValueError('Running status without a preceding status byte')
+				kind = status & 0xF0
+				if kind == 0xC0 or kind == 0xD0:
+					pos += 1
+				else:
+					if pos + 2 > end:
+						break
+					if kind == 0x90:
+						ticks[count] = tick
+						msgs[count, 0] = status
+						msgs[count, 1] = buf[pos]
+						msgs[count, 2] = buf[pos + 1]
+						count += 1
+					pos += 2
+		pos = end
+	return division, numerator, denominator, ticks[:count], msgs[:count]
+
+
+def _tick_range(ticks, start, end):
+	"""
+	Returns a tuple (lo, hi), the indices of the first events in the sorted
+	"ticks" array whose tick is >= start, and >= end.
+	"""
+	return np.searchsorted(ticks, start), np.searchsorted(ticks, end)
+
+if njit is not None:
+	# Compiled eagerly, when the module is imported, rather than on first use in
+	# the process callback. Typed for read-only arrays, which writable arrays
+	# convert to, so that ticks viewed on a blob and shifted copies both match.
+	_tick_range = njit(
+		numba_types.UniTuple(numba_types.intp, 2)(
+			numba_types.Array(numba_types.int32, 1, 'A', readonly = True),
+			numba_types.int64, numba_types.int64),
+		cache = True)(_tick_range)
+
+
+class _LoopEvents:
+	"""
+	The events of a Loop, decoded from its "midi_events" blob when first used.
+	Shared by copies of a Loop, so that the blob is decoded at most once.
+	"""
+
+	def __init__(self, midi_events):
+		self._midi_events = midi_events
+		self._arrays = None
+
+	def arrays(self):
+		"""
+		Returns a tuple (ticks, msgs, last_tick), decoding the blob if necessary.
+		"""
+		if self._arrays is None:
+			ticks, msgs = _load_events(self._midi_events)
+			self._arrays = ticks, msgs, int(ticks[-1]) if len(ticks) else 0
+			self._midi_events = None
+		return self._arrays
 
 
 class Loop:
 	"""
 	A collection of MIDI events timed by beat.
+	Events are held in two parallel arrays, sorted by time:
+		ticks	: int32 array, the time of each event in TICKS_PER_BEAT ticks per beat
+		msgs	: uint8 array of shape (N, 3), the MIDI bytes of each event
+	These arrays are never modified, so they may be shared between copies of a
+	Loop. "beat_offset" is applied when events are read.
+	The arrays are only decoded from the database blob when first accessed, so
+	that listing loops by name does not decode their events.
 	"""
 
 	def __init__(self, fetched_row):
 		self.loop_id, self.loop_group, self.name, \
 			self.beats_per_measure, self.measures, midi_events = fetched_row
-		evfile = io.BytesIO(midi_events)
-		self.events = np.load(evfile)
+		self._events = _LoopEvents(midi_events)
 		self._beat_offset = 0
-		self.active = False
+		self._tick_offset = 0
+		self._active = False
+		self._looper = None		# The Looper this loop is loaded in, if any
+
+	@property
+	def ticks(self):
+		"""
+		Returns the int32 array of event ticks, not including "beat_offset"
+		"""
+		return self._events.arrays()[0]
+
+	@property
+	def msgs(self):
+		"""
+		Returns the uint8 array of event bytes, of shape (N, 3)
+		"""
+		return self._events.arrays()[1]
+
+	def load_events(self):
+		"""
+		Decodes the events of this Loop, if they have not been already.
+		"""
+		self._events.arrays()
 
 	@property
 	def event_count(self):
 		"""
 		Returns the number of note on/off events
 		"""
-		return len(self.events)
+		return len(self.ticks)
 
 	@property
 	def last_beat(self):
 		"""
 		Returns the highest beat of all events
 		"""
-		return self.events[-1]['beat']
+		return self.last_tick / TICKS_PER_BEAT
+
+	@property
+	def last_tick(self):
+		"""
+		Returns the highest tick of all events
+		"""
+		return self._events.arrays()[2] + self._tick_offset
+
+	@property
+	def active(self):
+		"""
+		True if this loop is played.
+		When the loop is loaded in a Looper, setting this refreshes the Looper's
+		active loops, as "Looper.enable_loop" does, but without resetting other
+		loops when "Looper.loop_exclusive" is True.
+		"""
+		return self._active
+
+	@active.setter
+	def active(self, state):
+		self._active = state
+		if self._looper is not None:
+			self._looper._remeasure()
 
 	@property
 	def beat_offset(self):
 		"""
 		Play position offset, i.e.
 			If offset is 4, all notes are played 4 beats late
+		A Looper merges the offset into the events it plays when the loop is loaded
+		or enabled. Setting it afterwards does not change playback; use
+		"Looper.offset_loop" to offset a loaded loop.
 		"""
 		return self._beat_offset
 
 	@beat_offset.setter
 	def beat_offset(self, val):
-		self.events['beat'] += (val - self._beat_offset)
+		self._tick_offset = round(val * TICKS_PER_BEAT)
 		self._beat_offset = val
 
-	def events_between(self, start, end):
+	@property
+	def tick_offset(self):
 		"""
-		Returns events whose "beat" is >= start and < end
+		"beat_offset", rounded to whole ticks
 		"""
-		return self.events[(self.events['beat'] >= start) & (self.events['beat'] < end)]
+		return self._tick_offset
+
+	def events_between(self, start, end):
+		"""
+		Returns a tuple (ticks, msgs) of the events whose tick, including
+		"beat_offset", is >= start and < end
+		start, end: ticks. Fractional ticks are rounded up, which selects the same
+		events, as event ticks are integers; the search is done on integers so that
+		the ticks array is not converted to float.
+		"""
+		ticks, msgs, _ = self._events.arrays()
+		offset = self._tick_offset
+		lo, hi = _tick_range(ticks, ceil(start) - offset, ceil(end) - offset)
+		if offset:
+			return ticks[lo:hi] + offset, msgs[lo:hi]
+		return ticks[lo:hi], msgs[lo:hi]
 
 	def __str__(self):
 		return f'Loop #{self.loop_id}: "{self.name}", {self.beats_per_measure} beats per measure, ' + \
@@ -94,32 +416,69 @@ class Loop:
 		"""
 		Nicely formatted event printing
 		"""
-		for i, evt in enumerate(self.events):
-			print(f'{i:3d}: {evt[0]:.3f}  0x{evt[1][0]:x} {evt[1][1]} {evt[1][2]}')
+		beats = ((self.ticks + self._tick_offset) / TICKS_PER_BEAT).tolist()
+		print('\n'.join(f'{i:3d}: {beat:.3f}  0x{status:x} {data1} {data2}'
+			for i, (beat, (status, data1, data2)) in enumerate(zip(beats, self.msgs.tolist()))))
 
 
 class LoopsDB:
 	"""
 	Interface to sqlite database in which loops are saved.
+	Recently used loops are kept in memory, up to "loop_cache_size" of them.
+	If "parse_cache_dir" is set, parsed midi files are saved there, so that files
+	which have been imported before are not parsed again. It is None by default,
+	as loading a cached file is slower than parsing it when numba is installed.
+	Set it to DEFAULT_PARSE_CACHE_DIR, for instance, when numba is not installed.
+
+	If "in_memory" is True, the whole database is copied into an in-memory
+	database when opened, so that loading loops never touches the disk. Changes
+	made through "init_schema", "delete_all" and "import_dirs" are made to the
+	database file, which is then copied into memory again. Changes made by other
+	processes are not seen until then. Changes made through "conn" are not saved.
 	"""
 
+	loop_cache_size = 256
+	parse_cache_dir = None
+
 	_connection = None
+	_disk_connection = None		# The same as _connection, unless in_memory
 	_loop_names = None
 	_groups = None
+	_loop_cache = None
+	# Database files whose schema has been checked by this process:
+	_checked_files = set()
 
-	def __init__(self, dbfile):
-		if not os.path.isfile(dbfile):
+	def __init__(self, dbfile, in_memory = False):
+		if os.path.isfile(dbfile):
+			checked = os.path.realpath(dbfile) in self._checked_files
+		else:
+			checked = False
 			db_dir = os.path.dirname(dbfile)
 			try:
 				os.mkdir(db_dir)
 			except FileExistsError:
 				pass
+		self._loop_cache = OrderedDict()
 		self._connection = sqlite3.connect(dbfile)
 		self._connection.execute('PRAGMA foreign_keys = ON')
-		cursor = self._connection.execute('SELECT name FROM sqlite_master WHERE type="table"')
-		rows = cursor.fetchall()
-		if len(rows) == 0:
-			self.init_schema()
+		# Write-ahead logging, so that reads are not blocked by writes, and commits
+		# sync the log only at checkpoints:
+		self._connection.execute('PRAGMA journal_mode = WAL')
+		self._connection.execute('PRAGMA synchronous = NORMAL')
+		# 20 MB page cache, and up to 256 MB of the file memory-mapped, so that
+		# event blobs are read without an extra copy into the page cache:
+		self._connection.execute('PRAGMA cache_size = -20000')
+		self._connection.execute('PRAGMA mmap_size = 268435456')
+		self._disk_connection = self._connection
+		if not checked:
+			cursor = self._connection.execute(
+				"SELECT EXISTS(SELECT 1 FROM sqlite_master WHERE type = 'table')")
+			if not cursor.fetchone()[0]:
+				self.init_schema()
+			self._checked_files.add(os.path.realpath(dbfile))
+		if in_memory:
+			self._connection = sqlite3.connect(':memory:')
+			self._reload()
 
 	def conn(self):
 		"""
@@ -131,12 +490,12 @@ class LoopsDB:
 		"""
 		Nukes any existing tables (if they exist) and rebuilds the database schema.
 		"""
-		self._connection.execute("DROP INDEX IF EXISTS bpm_index")
-		self._connection.execute("DROP INDEX IF EXISTS measures_index")
-		self._connection.execute("DROP INDEX IF EXISTS pitch_index")
-		self._connection.execute("DROP TABLE IF EXISTS pitches")
-		self._connection.execute("DROP TABLE IF EXISTS loops")
-		self._connection.execute("""
+		self._disk_connection.execute("DROP INDEX IF EXISTS bpm_index")
+		self._disk_connection.execute("DROP INDEX IF EXISTS measures_index")
+		self._disk_connection.execute("DROP INDEX IF EXISTS pitch_index")
+		self._disk_connection.execute("DROP TABLE IF EXISTS pitches")
+		self._disk_connection.execute("DROP TABLE IF EXISTS loops")
+		self._disk_connection.execute("""
 			CREATE TABLE loops (
 				loop_id INTEGER PRIMARY KEY,
 				loop_group TEXT,
@@ -145,106 +504,225 @@ class LoopsDB:
 				measures INTEGER,
 				midi_events BLOB
 			)""")
-		self._connection.execute("""
+		self._disk_connection.execute("""
 			CREATE TABLE pitches (
 				loop_id INTEGER,
 				pitch INTEGER,
 				FOREIGN KEY(loop_id) REFERENCES loops(loop_id) ON DELETE CASCADE
 			)""")
-		self._connection.execute("CREATE INDEX bpm_index ON loops (beats_per_measure)")
-		self._connection.execute("CREATE INDEX measures_index ON loops (measures)")
-		self._connection.execute("CREATE INDEX pitch_index ON pitches (pitch)")
+		self._disk_connection.execute("CREATE INDEX bpm_index ON loops (beats_per_measure)")
+		self._disk_connection.execute("CREATE INDEX measures_index ON loops (measures)")
+		self._disk_connection.execute("CREATE INDEX pitch_index ON pitches (pitch)")
+		self._reload()
+
+	def _reload(self):
+		"""
+		When the database is held in memory, copies the database file into memory
+		again, after changes were made to it.
+		"""
+		if self._connection is not self._disk_connection:
+			self._disk_connection.backup(self._connection)
+			self._connection.execute('PRAGMA foreign_keys = ON')
 
 	def delete_all(self):
 		"""
 		Deletes all loops (and thus, groups) from the database.
 		"""
-		self._connection.execute("DELETE FROM loops")
-		self._connection.commit()
+		self._disk_connection.execute("DELETE FROM loops")
+		self._disk_connection.commit()
+		self._reload()
+		self._loop_names = None
+		self._groups = None
+		self._loop_cache.clear()
 
 	def import_dirs(self, base_dir):
 		"""
 		Recursively searches for midi files in the given directory and adds each of
 		them to the database as a new Loop.
+		Without numba, files are parsed with mido in parallel, in a pool of worker
+		processes. The numba parser is faster than starting the workers, so with
+		numba, files are parsed in this process. All are then inserted in a single
+		transaction, committed once at the end.
+		Rows are inserted in bulk, with loop_ids assigned here rather than by
+		SQLite, so that pitches can reference them. The transaction takes the write
+		lock before reading the highest loop_id, so that other connections cannot
+		insert rows with the same ids.
 		"""
-		cursor = self._connection.cursor()
 		loop_sql = """
-			INSERT INTO loops(loop_group, name, beats_per_measure, measures, midi_events)
-			VALUES (?,?,?,?,?)
+			INSERT INTO loops(loop_id, loop_group, name, beats_per_measure, measures, midi_events)
+			VALUES (?,?,?,?,?,?)
 			"""
 		pitch_sql = """
 			INSERT INTO pitches VALUES (?,?)
 			"""
+		loop_rows = []
+		pitch_rows = []
+		imported = []
 		files = glob.glob(os.path.join(base_dir, '**' , '*.mid'), recursive=True)
-		with IncrementalBar('Importing loops', max = len(files)) as progress_bar:
-			for filename in files:
-				loop_group = re.sub(r'(_|[^\w])+', ' ', os.path.dirname(filename).replace(base_dir, '')).strip()
+		executor = ProcessPoolExecutor() if njit is None else nullcontext()
+		with IncrementalBar('Importing loops', max = len(files)) as progress_bar, executor:
+			# The cache dir is passed to workers, as they may not see it if it was set
+			# after this module was imported. Results are returned in the order of
+			# "files", so that loop_ids do not depend on which worker finishes first:
+			cache_dirs = repeat(self.parse_cache_dir)
+			if njit is None:
+				results = executor.map(_parse_for_import, files, cache_dirs, chunksize = 8)
+			else:
+				results = map(_parse_for_import, files, cache_dirs)
+			for filename, (parsed, error) in zip(files, results):
+				loop_group = ' '.join(os.path.dirname(filename).replace(base_dir, '')
+					.translate(GROUP_NAME_TABLE).split())
 				name = os.path.splitext(os.path.basename(filename))[0]
-				try:
-					beats_per_measure, measures, pitches, events = self.read_midi_file(filename)
-					evfile = io.BytesIO()
-					np.save(evfile, events)
-					evfile.seek(0)
-					cursor.execute(loop_sql, (loop_group, name, beats_per_measure, measures, evfile.read()))
-					cursor.executemany(pitch_sql, [ (cursor.lastrowid, pitch) for pitch in pitches ])
-					self._connection.commit()
-				except Exception as e:
-					print(f'Failed to import {name}. ERROR {e.__class__.__name__} "{e}"')
+				if error is None:
+					imported.append((loop_group, name, parsed))
+				else:
+					print(f'Failed to import {name}. ERROR {error}')
 				progress_bar.next()
+		# Parsed before the transaction begins, so that other connections are not
+		# locked out while parsing:
+		with self._disk_connection:
+			self._disk_connection.execute('BEGIN IMMEDIATE')
+			cursor = self._disk_connection.execute('SELECT COALESCE(MAX(loop_id), 0) FROM loops')
+			loop_id = cursor.fetchone()[0]
+			for loop_group, name, (beats_per_measure, measures, pitches, midi_events) in imported:
+				loop_id += 1
+				loop_rows.append((loop_id, loop_group, name, beats_per_measure, measures,
+					midi_events))
+				pitch_rows.extend((loop_id, pitch) for pitch in pitches.tolist())
+			self._disk_connection.executemany(loop_sql, loop_rows)
+			self._disk_connection.executemany(pitch_sql, pitch_rows)
+		self._reload()
 		self._loop_names = None
 		self._groups = None
+		self._loop_cache.clear()
 
 	@classmethod
 	def read_midi_file(cls, midi_filename):
 		"""
-		Returns beats_per_measure, measures, pitches, events
+		Returns beats_per_measure, measures, pitches, ticks, msgs
 			beats_per_measure	: (int)
 			measures			: (int) measure count, rounded up
-			pitches				: (set) pitches of a noteon events
-			events				: nparray of EVENT_STRUCT
+			pitches				: nparray of the distinct pitches of note on events, sorted
+			ticks				: int32 nparray, the time of each event, sorted, in
+								  TICKS_PER_BEAT ticks per beat
+			msgs				: uint8 nparray of shape (N, 3), the bytes of each event
+		Results are cached in "parse_cache_dir", if set, keyed by a hash of the
+		contents of the file, PARSE_CACHE_VERSION and TICKS_PER_BEAT.
+		"""
+		return cls._read_midi_file(midi_filename, cls.parse_cache_dir)
+
+	@classmethod
+	def _read_midi_file(cls, midi_filename, parse_cache_dir):
+		"""
+		Returns the result of "read_midi_file", using the given "parse_cache_dir"
+		in place of the class attribute.
+		"""
+		if parse_cache_dir is None:
+			return cls._parse_midi_file(midi_filename)
+		digest = blake2b(f'{PARSE_CACHE_VERSION}:{TICKS_PER_BEAT}:'.encode(), digest_size = 16)
+		with open(midi_filename, 'rb') as fob:
+			digest.update(fob.read())
+		digest = digest.hexdigest()
+		cache_file = os.path.join(parse_cache_dir, digest + '.npz')
+		if os.path.isfile(cache_file):
+			try:
+				with np.load(cache_file) as cached:
+					beats_per_measure, measures = cached['meta'].tolist()
+					return beats_per_measure, measures, cached['pitches'], \
+						cached['ticks'], cached['msgs']
+			except Exception as e:
+				logging.debug('Discarding cached %s: %s', cache_file, e)
+		beats_per_measure, measures, pitches, ticks, msgs = cls._parse_midi_file(midi_filename)
+		try:
+			os.makedirs(parse_cache_dir, exist_ok = True)
+			# Written under a temporary name and renamed, so that a partially written
+			# file is never read:
+			temp_file = f'{cache_file}.{os.getpid()}.tmp'
+			with open(temp_file, 'wb') as fob:
+				np.savez(fob, meta = np.array([beats_per_measure, measures]),
+					pitches = pitches, ticks = ticks, msgs = msgs)
+			os.replace(temp_file, cache_file)
+		except OSError as e:
+			logging.debug('Could not cache %s: %s', midi_filename, e)
+		return beats_per_measure, measures, pitches, ticks, msgs
+
+	@classmethod
+	def _parse_midi_file(cls, midi_filename):
+		"""
+		Returns beats_per_measure, measures, pitches, ticks, msgs, parsing the file
+		without using "parse_cache_dir". See "read_midi_file".
+		"""
+		if njit is None:
+			ticks_per_beat, beats_per_measure, ticks, msgs = cls._parse_with_mido(midi_filename)
+		else:
+			ticks_per_beat, beats_per_measure, ticks, msgs = cls._parse_with_numba(midi_filename)
+		# Loop.events_between relies on events being sorted by time. A stable sort
+		# keeps events of the same tick in track order, as mido.merge_tracks does.
+		order = np.argsort(ticks, kind = 'stable')
+		# Convert from the file's resolution to TICKS_PER_BEAT, rounding to nearest.
+		# Computed in int64, as the product may overflow int32, then narrowed:
+		ticks = ((ticks[order] * TICKS_PER_BEAT + ticks_per_beat // 2) // ticks_per_beat).astype(np.int32)
+		msgs = msgs[order]
+		measures = int(ticks[-1] // (beats_per_measure * TICKS_PER_BEAT)) + 1 if len(ticks) else 1
+		# Counted over all 128 pitches, in place of building a set:
+		pitches = np.flatnonzero(np.bincount(msgs[:,1], minlength = 128))
+		return int(beats_per_measure), measures, pitches, ticks, msgs
+
+	@classmethod
+	def _parse_with_mido(cls, midi_filename):
+		"""
+		Returns ticks_per_beat, beats_per_measure, ticks, msgs, parsing the file
+		with mido. See "read_midi_file".
 		"""
-		# Use mido to open
 		mid = MidiFile(midi_filename)
-		# Default calculations, overriden by set_tempo and time_signature events
-		usecs_per_beat = DEFAULT_USECS_PER_BEAT
+		# Default, overriden by time_signature events
 		beats_per_measure = DEFAULT_BEATS_PER_MEASURE
-		seconds_per_beat = usecs_per_beat / USECS_PER_SECOND
-		seconds_per_measure = seconds_per_beat * beats_per_measure
-		# Initialize numpy array
-		note_event_count = 0
-		for msg in mid:
-			if msg.type == 'note_on':
-				note_event_count += 1
-		events = np.zeros(note_event_count, EVENT_STRUCT)
-		# Initialize running vars
-		time = 0
-		ordinal = 0
-		measure = 0
-		pitches = []
-		for msg in mid:
-			if msg.type == 'set_tempo':
-				usecs_per_beat = msg.tempo
-				seconds_per_beat = usecs_per_beat / USECS_PER_SECOND
-				seconds_per_measure = seconds_per_beat * beats_per_measure
-			elif msg.type == 'time_signature':
+		# Work in ticks, which are independent of tempo; a single merged track
+		# yields messages in time order, with delta times in ticks.
+		tick = 0
+		ticks = []
+		# Message bytes are collected by column, from mido's integer attributes:
+		statuses = []
+		notes = []
+		velocities = []
+		for msg in merge_tracks(mid.tracks):
+			tick += msg.time
+			if msg.type == 'time_signature':
 				beats_per_measure = msg.numerator * 4 / msg.denominator
-				seconds_per_measure = seconds_per_beat * beats_per_measure
 			elif msg.type == 'note_on':
-				measure = int(time / seconds_per_measure)
-				beat = time / seconds_per_beat
-				events[ordinal] = ( beat, msg.bytes() )
-				ordinal += 1
-				pitches.append(msg.note)
-			time += msg.time
-		return int(beats_per_measure), measure + 1, set(pitches), events
+				ticks.append(tick)
+				statuses.append(0x90 | msg.channel)
+				notes.append(msg.note)
+				velocities.append(msg.velocity)
+		msgs = np.empty((len(ticks), 3), np.uint8)
+		msgs[:,0] = statuses
+		msgs[:,1] = notes
+		msgs[:,2] = velocities
+		return mid.ticks_per_beat, beats_per_measure, np.asarray(ticks, dtype = np.int64), msgs
+
+	@classmethod
+	def _parse_with_numba(cls, midi_filename):
+		"""
+		Returns ticks_per_beat, beats_per_measure, ticks, msgs, parsing the raw
+		bytes of the file with the numba-compiled "_parse_smf". See "read_midi_file".
+		Files which "_parse_smf" cannot handle are parsed with mido instead.
+		"""
+		with open(midi_filename, 'rb') as fob:
+			buf = np.frombuffer(fob.read(), dtype = np.uint8)
+		try:
+			ticks_per_beat, numerator, denominator, ticks, msgs = _parse_smf(buf)
+		except ValueError as e:
+			logging.debug('%s: %s - parsing with mido', midi_filename, e)
+			return cls._parse_with_mido(midi_filename)
+		beats_per_measure = numerator * 4 / denominator if numerator else DEFAULT_BEATS_PER_MEASURE
+		return ticks_per_beat, beats_per_measure, ticks, msgs
 
 	def groups(self):
 		"""
 		Returns list of strings, all group names in the database.
 		"""
 		if self._groups is None:
-			cursor = self._connection.cursor()
-			cursor.execute('SELECT DISTINCT(loop_group) FROM loops')
+			cursor = self._connection.execute('SELECT DISTINCT(loop_group) FROM loops')
 			self._groups = [ row[0] for row in cursor.fetchall() ]
 		return self._groups
 
@@ -253,9 +731,9 @@ class LoopsDB:
 		Returns list of Loop objects belonging to the given group.
 		loop_group: (string) group name
 		"""
-		cursor = self._connection.cursor()
-		cursor.execute('SELECT * FROM loops WHERE loop_group = ? ORDER BY name', (loop_group,))
-		return [ Loop(row) for row in cursor.fetchall() ]
+		cursor = self._connection.execute(
+			'SELECT * FROM loops WHERE loop_group = ? ORDER BY name', (loop_group,))
+		return [ self._cached_loop(row[0]) or self._cache_loop(row) for row in cursor.fetchall() ]
 
 	def loop_ids(self):
 		"""
@@ -268,8 +746,7 @@ class LoopsDB:
 		Returns dict(loop_id:name)
 		"""
 		if self._loop_names is None:
-			cursor = self._connection.cursor()
-			cursor.execute('SELECT loop_id, name FROM loops')
+			cursor = self._connection.execute('SELECT loop_id, name FROM loops')
 			self._loop_names = { row[0]:row[1] for row in cursor.fetchall() }
 		return self._loop_names
 
@@ -277,15 +754,85 @@ class LoopsDB:
 		"""
 		Returns a Loop identified by the given loop_id.
 		"""
-		cursor = self._connection.cursor()
-		cursor.execute('SELECT * FROM loops WHERE loop_id = ?', (loop_id,))
-		return Loop(cursor.fetchone())
+		loop = self._cached_loop(loop_id)
+		if loop is None:
+			cursor = self._connection.execute('SELECT * FROM loops WHERE loop_id = ?', (loop_id,))
+			loop = self._cache_loop(cursor.fetchone())
+		return loop
+
+	def preload(self, loop_group = None):
+		"""
+		Reads loops into the cache with a single query, and decodes their events,
+		so that later calls to "loop", "group_loops" and "random_loop" need not.
+		loop_group: (string) group name; if given, only loops of this group are read.
+		At most "loop_cache_size" loops are read. If there are more than that, the
+		loops read are simply those with the lowest loop_ids, which need not include
+		the loops used next; pass a group name to preload a particular group.
+		"""
+		if loop_group is None:
+			cursor = self._connection.execute(
+				'SELECT * FROM loops ORDER BY loop_id LIMIT ?', (self.loop_cache_size,))
+		else:
+			cursor = self._connection.execute(
+				'SELECT * FROM loops WHERE loop_group = ? ORDER BY name LIMIT ?',
+				(loop_group, self.loop_cache_size))
+		for row in cursor:
+			if row[0] not in self._loop_cache:
+				self._cache_loop(row).load_events()
+
+	def _cached_loop(self, loop_id):
+		"""
+		Returns a copy of the cached Loop identified by the given loop_id, or None
+		if it is not cached.
+		Copies share the (read-only) event arrays of the cached Loop, but have
+		their own "active" and "beat_offset" state.
+		"""
+		if loop_id not in self._loop_cache:
+			return None
+		self._loop_cache.move_to_end(loop_id)
+		return copy(self._loop_cache[loop_id])
+
+	def _cache_loop(self, fetched_row):
+		"""
+		Constructs a Loop from a row of the "loops" table and adds it to the cache,
+		evicting the least recently used Loop if the cache is full.
+		Returns a copy of the new Loop.
+		"""
+		loop = Loop(fetched_row)
+		self._loop_cache[loop.loop_id] = loop
+		while len(self._loop_cache) > self.loop_cache_size:
+			self._loop_cache.popitem(last = False)
+		return copy(loop)
 
 	def random_loop(self):
 		"""
 		Returns one random Loop object.
-		"""
-		return self.loop(choice(self.loop_ids()))
+		The choice is made by SQLite, which sorts only loop ids, rather than reading
+		every loop_id into Python.
+		"""
+		cursor = self._connection.execute("""
+			SELECT * FROM loops
+			WHERE loop_id = (SELECT loop_id FROM loops ORDER BY RANDOM() LIMIT 1)
+			""")
+		row = cursor.fetchone()
+		return self._cached_loop(row[0]) or self._cache_loop(row)
+
+
+def _parse_for_import(midi_filename, parse_cache_dir):
+	"""
+	Parses a midi file for "LoopsDB.import_dirs", possibly in a worker process.
+	Returns a tuple (parsed, error), one of which is None:
+		parsed	: (beats_per_measure, measures, pitches, midi_events blob)
+		error	: (string) the exception raised while parsing, as it is printed
+	The exception is returned as a string, rather than raised, so that one file
+	which fails to import does not stop the others, and need not be picklable.
+	"""
+	try:
+		beats_per_measure, measures, pitches, ticks, msgs = LoopsDB._read_midi_file(
+			midi_filename, parse_cache_dir)
+	except Exception as e:
+		return None, f'{e.__class__.__name__} "{e}"'
+	return (beats_per_measure, measures, pitches, _dump_events(ticks, msgs)), None
 
 
 class Looper:
@@ -298,14 +845,27 @@ class Looper:
 		self.client_name = client_name
 		self._bpm = DEFAULT_BEATS_PER_MINUTE
 		self.beats_per_measure = None
-		self.beat = 0.0
-		self.beats_length = 0.0
+		self.tick = 0.0			# play position; fractional, carried between blocks
+		self.ticks_length = 0	# loop length, in whole measures
 		self.loops = {} 	# dict indexed on loop_id
+		self._active_loops = []
+		# Events of all active loops, merged; see "_merge_events":
+		self._timeline = (np.empty(0, np.int32), np.empty((0, 3), np.uint8))
+		# Scratch buffers for computing the sample offsets of each block's events,
+		# grown as needed by "_remeasure":
+		self._scratch_times = np.empty(256, np.float64)
+		self._scratch_offsets = np.empty(256, np.int32)
 		self.loop_exclusive = True
 		self.is_playing = False
 		self.stop_event = Event()
 		self.loop_manipulation_lock = Lock()
+		# "All Notes Off" (control change 0x7B) for channels 0 - 15, sent on stop:
+		self._all_notes_off = np.zeros((16, 3), np.uint8)
+		self._all_notes_off[:,0] = np.arange(0xB0, 0xC0)
+		self._all_notes_off[:,1] = 0x7B
+		self._all_notes_off_offsets = np.zeros(16, np.int32)
 		self._real_process_callback = self._null_process_callback
+		self._write_events = self._port_write_events
 		self.create_client()
 		self._rescale()
 
@@ -322,6 +882,14 @@ class Looper:
 		self.client.activate()
 		self.client.get_ports()
 		self.out_port = self.client.midi_outports.register('out')
+		self._write_events = self._jack_write_events
+
+	@property
+	def beat(self):
+		"""
+		Play position, in beats.
+		"""
+		return self.tick / TICKS_PER_BEAT
 
 	@property
 	def bpm(self):
@@ -346,10 +914,10 @@ class Looper:
 		if self.beats_per_measure is not None and \
 			loop.beats_per_measure != self.beats_per_measure:
 			raise RuntimeError("beats_per_measure mismatch")
-		with self.loop_manipulation_lock:
-			self.beats_per_measure = loop.beats_per_measure
-			self.loops[loop.loop_id] = loop
-			self._remeasure()
+		self.beats_per_measure = loop.beats_per_measure
+		self.loops[loop.loop_id] = loop
+		loop._looper = self
+		self._remeasure()
 		return loop
 
 	def extend_loops(self, loop_list):
@@ -364,10 +932,11 @@ class Looper:
 		for loop in loop_list:
 			if loop.beats_per_measure != beats_per_measure:
 				raise RuntimeError("beats_per_measure mismatch")
-		with self.loop_manipulation_lock:
-			self.beats_per_measure = beats_per_measure
-			self.loops.update({ loop.loop_id:loop for loop in loop_list })
-			self._remeasure()
+		self.beats_per_measure = beats_per_measure
+		self.loops.update({ loop.loop_id:loop for loop in loop_list })
+		for loop in loop_list:
+			loop._looper = self
+		self._remeasure()
 
 	def enable_loop(self, loop_id, state):
 		"""
@@ -376,29 +945,78 @@ class Looper:
 		If "self.loop_exclusive" is True, and "state" is True, resets the "active"
 		property on all other loaded loops so that only one loop is active at a time.
 		"""
+		# Set without the "active" setter, which would remeasure for every loop:
 		if state and self.loop_exclusive:
 			for loop in self.loops.values():
-				loop.active = loop.loop_id == loop_id
+				loop._active = loop.loop_id == loop_id
 		else:
-			self.loops[loop_id].active = state
-		with self.loop_manipulation_lock:
-			self._remeasure()
+			self.loops[loop_id]._active = state
+		self._remeasure()
+
+	def offset_loop(self, loop_id, beat_offset):
+		"""
+		Sets the "beat_offset" property on the loop identified by loop_id.
+		Loops' offsets are merged into the events played, so set them here, rather
+		than on the Loop itself, once the loop is loaded.
+		"""
+		self.loops[loop_id].beat_offset = beat_offset
+		self._remeasure()
 
 	def _remeasure(self):
 		"""
 		Determines how many beats to loop based on the beats-per-measure and total
 		number of beats in all active loops. Called from "append_loop" and
 		"extend_loops" functions.
-		"""
-		if self.any_loop_active():
-			last_beat = max( loop.last_beat for loop in self.loops.values() if loop.active )
-			self.beats_length = float(ceil(last_beat / self.beats_per_measure) * self.beats_per_measure)
+		Refreshes the list of active loops, and the timeline of their events read by
+		the process callback, too. These are computed before taking
+		"loop_manipulation_lock", which is only held while they are assigned, as the
+		process callback skips blocks while it is held.
+		"""
+		active_loops = [ loop for loop in self.loops.values() if loop.active ]
+		timeline = self._merge_events(active_loops)
+		if active_loops:
+			last_tick = max( loop.last_tick for loop in active_loops )
+			ticks_per_measure = self.beats_per_measure * TICKS_PER_BEAT
+			ticks_length = ceil(last_tick / ticks_per_measure) * ticks_per_measure
 		else:
-			self.beats_length = 0.0
-		if self.beat > self.beats_length:
-			self.beat = 0.0
+			ticks_length = 0
+		size = len(self._scratch_offsets)
+		while size < len(timeline[0]):
+			size *= 2
+		with self.loop_manipulation_lock:
+			# The scratch buffers, which must hold as many events as the timeline, only
+			# grow, and are assigned before the timeline:
+			if size > len(self._scratch_offsets):
+				self._scratch_times = np.empty(size, np.float64)
+				self._scratch_offsets = np.empty(size, np.int32)
+			self._active_loops = active_loops
+			self._timeline = timeline
+			self.ticks_length = ticks_length
+			if self.tick > ticks_length:
+				self.tick = 0.0
+
+	@staticmethod
+	def _merge_events(loops):
+		"""
+		Merges the events of the given loops, with their beat offsets applied, into
+		a tuple (ticks, msgs) of arrays sorted by tick, so that the process callback
+		searches one array per block, however many loops are active.
+		The timeline is assigned as one tuple, so that the process callback never
+		reads ticks and msgs of different timelines. Merging also decodes the events
+		of newly activated loops, rather than in the process callback.
+		"""
+		if not loops:
+			return (np.empty(0, np.int32), np.empty((0, 3), np.uint8))
+		ticks = np.concatenate([ loop.ticks + loop.tick_offset for loop in loops ])
+		msgs = np.concatenate([ loop.msgs for loop in loops ])
+		# A stable sort keeps events of the same tick in the order of the loops:
+		order = np.argsort(ticks, kind = 'stable')
+		return (ticks[order], msgs[order])
 
 	def loop(self, loop_id):
+		"""
+		Returns the loaded loop identified by loop_id.
+		"""
 		return self.loops[loop_id]
 
 	def loaded_loop_ids(self):
@@ -409,23 +1027,30 @@ class Looper:
 
 	def any_loop_active(self):
 		"""
-		Returns boolean True if any loaded loop's "active" attribute is True.
+		Returns boolean True if any loaded loop's "active" property is True.
+		Reads the list of active loops kept by "_remeasure", rather than checking
+		every loaded loop. The list is refreshed whenever a loaded loop's "active"
+		property is set, as well as by "enable_loop", "append_loop",
+		"extend_loops", "offset_loop" and "clear".
 		"""
-		return any(loop.active for loop in self.loops.values())
+		return bool(self._active_loops)
 
 	def clear(self):
 		"""
 		Removes all loops from the current loaded loops.
 		"""
 		self.stop()
+		for loop in self.loops.values():
+			loop._looper = None
 		self.loops = {}
+		self._remeasure()
 		self.beats_per_measure = None
 
 	def _rescale(self):
-		beats_per_second = self._bpm / 60
-		self.samples_per_beat = self.client.samplerate / beats_per_second
+		ticks_per_second = self._bpm / 60 * TICKS_PER_BEAT
+		self.samples_per_tick = self.client.samplerate / ticks_per_second
 		seconds_per_process = self.client.blocksize / self.client.samplerate
-		self.beats_per_process = beats_per_second * seconds_per_process
+		self.ticks_per_process = ticks_per_second * seconds_per_process
 
 	def stop(self):
 		"""
@@ -449,33 +1074,68 @@ class Looper:
 	def _null_process_callback(self, frames):
 		pass
 
-	def _play_process_callback(self, _):
+	def _play_process_callback(self, frames):
 		self.out_port.clear_buffer()
-		if self.any_loop_active() and not self.loop_manipulation_lock.locked():
-			last_beat = self.beat + self.beats_per_process
+		ticks, msgs = self._timeline
+		if len(ticks) and not self.loop_manipulation_lock.locked():
+			# Attribute lookups bound to locals once per block. The scratch buffers are
+			# read after the timeline, so they are at least as large as it is:
+			write_events = self._write_events
+			scratch_times = self._scratch_times
+			scratch_offsets = self._scratch_offsets
+			samples_per_tick = self.samples_per_tick
+			ticks_length = self.ticks_length
+			tick = self.tick
+			last_tick = tick + self.ticks_per_process
 			while True:
-				events_this_block = np.hstack([loop.events_between(self.beat, last_beat) \
-					for loop in self.loops.values() if loop.active])
-				if len(events_this_block):
-					for evt in np.sort(events_this_block, kind="heapsort", order="beat"):
-						offset = int((evt['beat'] - self.beat) * self.samples_per_beat)
-						self.out_port.write_midi_event(offset, evt['msg'])
-				if last_beat < self.beats_length:
-					self.beat = last_beat
+				# Events at integer ticks >= tick and < last_tick:
+				lo, hi = _tick_range(ticks, ceil(tick), ceil(last_tick))
+				if lo < hi:
+					# Sample offsets of the whole block in vectorized operations, written
+					# to the scratch buffers rather than allocating new arrays:
+					times = np.subtract(ticks[lo:hi], tick, out = scratch_times[:hi - lo])
+					np.multiply(times, samples_per_tick, out = times)
+					offsets = scratch_offsets[:hi - lo]
+					np.copyto(offsets, times, casting = 'unsafe')
+					write_events(frames, offsets, msgs[lo:hi])
+				if last_tick < ticks_length:
+					self.tick = last_tick
 					break
-				last_beat -= self.beats_length
-				self.beat -= self.beats_length
+				last_tick -= ticks_length
+				tick -= ticks_length
+
+	def _port_write_events(self, _, offsets, msgs):
+		"""
+		Writes events, sorted by sample offset, to the output port one at a time,
+		using its "write_midi_event" method. Used when the port was not created by
+		"create_client", e.g. a fake port used for testing.
+		"""
+		write = self.out_port.write_midi_event
+		for offset, msg in zip(offsets.tolist(), msgs):
+			write(offset, msg)
+
+	def _jack_write_events(self, frames, offsets, msgs):
+		"""
+		Writes events, sorted by sample offset, to the output port, calling
+		jack_midi_event_write through JACK-Client's cffi bindings. The port buffer is
+		looked up once per block, and a single cffi buffer wraps all of "msgs" (which
+		must be C-contiguous), where OwnMidiPort.write_midi_event does both for every
+		event.
+		"""
+		buf = _jack_lib.jack_port_get_buffer(self.out_port._ptr, frames)
+		data = _jack_ffi.from_buffer('jack_midi_data_t[]', msgs)
+		event_write = _jack_lib.jack_midi_event_write
+		for i, offset in enumerate(offsets.tolist()):
+			if event_write(buf, offset, data + 3 * i, 3):
+				raise JackError('Error writing MIDI event')
 
-	def _stop_process_callback(self, _):
+	def _stop_process_callback(self, frames):
 		"""
 		Sends MIDI message "All Notes Off" (0x7B) to all channels from 0 - 15,
 		and then transitions to "_null_process_callback"
 		"""
 		self.out_port.clear_buffer()
-		msg = bytearray.fromhex('B07B')
-		for channel in range(16):
-			self.out_port.write_midi_event(0, msg)
-			msg[0] += 1
+		self._write_events(frames, self._all_notes_off_offsets, self._all_notes_off)
 		self._real_process_callback = self._null_process_callback
 		self.stop_event.set()
 
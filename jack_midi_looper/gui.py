@@ -41,7 +41,11 @@ class MainWindow(QMainWindow):
 		super().__init__()
 		if dbfile is None:
 			dbfile = os.path.join(user_config_dir(), 'ZenSoSo', 'looper-loops.db')
-		self.loops_db = LoopsDB(dbfile)
+		# Held in memory, so that changing groups never waits on the disk:
+		self.loops_db = LoopsDB(dbfile, in_memory = True)
+		# Reads every loop when the database fits in the loop cache. Otherwise,
+		# groups are read when selected, by "LoopsDB.group_loops":
+		self.loops_db.preload()
 		self.setWindowTitle(f'Looper ({dbfile})')
 		self.setWindowIcon(QIcon(os.path.join(os.path.dirname(__file__), 'res', 'musecbox-icon.png')))
 		self.looper_widget = LooperWidget(self, self.loops_db, Looper())
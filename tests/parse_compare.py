@@ -0,0 +1,70 @@
+#  jack_midi_looper/tests/parse_compare.py
+#
+#  Copyright 2024 Leon Dionne <ldionne@dridesign.sh.cn>
+#
+#  This program is free software; you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation; either version 2 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software
+#  Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+#  MA 02110-1301, USA.
+#
+"""
+Checks that the numba midi parser gives the same events as the mido parser
+for every midi file in the given directories (default: drum-loops).
+"""
+import sys, os, glob
+import numpy as np
+import jack_midi_looper
+from jack_midi_looper import LoopsDB
+
+
+def sorted_events(ticks, msgs):
+	"""
+	Returns ticks, msgs sorted by tick, keeping the order of events at the same
+	tick, as LoopsDB.read_midi_file does.
+	"""
+	order = np.argsort(ticks, kind = 'stable')
+	return ticks[order], msgs[order]
+
+
+def main():
+	if jack_midi_looper.njit is None:
+		print('numba is not installed')
+		return 1
+	dirs = sys.argv[1:] or [os.path.join(os.path.dirname(__file__), 'drum-loops')]
+	files = [ filename for base_dir in dirs
+		for filename in glob.glob(os.path.join(base_dir, '**', '*.mid'), recursive = True) ]
+	compared = failures = 0
+	for filename in files:
+		try:
+			mido_tpb, mido_bpm, mido_ticks, mido_msgs = LoopsDB._parse_with_mido(filename)
+		except Exception as e:
+			print(f'Skipped {filename}: mido could not read it. ERROR {e.__class__.__name__} "{e}"')
+			continue
+		compared += 1
+		numba_tpb, numba_bpm, numba_ticks, numba_msgs = LoopsDB._parse_with_numba(filename)
+		mido_ticks, mido_msgs = sorted_events(mido_ticks, mido_msgs)
+		numba_ticks, numba_msgs = sorted_events(numba_ticks, numba_msgs)
+		if mido_tpb != numba_tpb or mido_bpm != numba_bpm \
+			or not np.array_equal(mido_ticks, numba_ticks) \
+			or not np.array_equal(mido_msgs, numba_msgs):
+			print('MISMATCH', filename)
+			failures += 1
+	print(f'{compared} files compared, {failures} mismatched')
+	return 1 if failures else 0
+
+
+if __name__ == "__main__":
+	sys.exit(main())
+
+
+#  end jack_midi_looper/tests/parse_compare.py